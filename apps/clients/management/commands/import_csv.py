@@ -1,17 +1,35 @@
 from django.core.management.base import BaseCommand
-from django.core.validators import validate_email
-from django.core.exceptions import ValidationError
-from django.db import transaction, IntegrityError
+from django.db import transaction
 from apps.clients.models import Client, UserClient
+from apps.common.utils import copy_insert, executemany_insert, iterate_in_thread, supports_copy
+from apps.common.validators import is_valid_email
 from apps.orders.models import Order
 from tqdm import tqdm
+from contextlib import closing
+from operator import itemgetter
 import csv
-import json
+import orjson
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+# Valeurs déjà nettoyées (boutiques, prénoms, villes...), réutilisées d'une ligne à l'autre
+_cleaned_values = {}
+_CLEANED_VALUES_MAX_SIZE = 100000
+
+
+def clean_value(value):
+    """Retourne la valeur sans espaces superflus, en partageant la même chaîne entre les valeurs répétées"""
+    cleaned = _cleaned_values.get(value)
+    if cleaned is None:
+        if len(_cleaned_values) >= _CLEANED_VALUES_MAX_SIZE:
+            _cleaned_values.clear()
+        cleaned = _cleaned_values[value] = value.strip()
+    return cleaned
+
+
 class Command(BaseCommand):
     help = 'Importe les clients et commandes depuis un CSV'
 
@@ -29,6 +47,32 @@ class Command(BaseCommand):
         'product_ids'
     ]
 
+    # Nombre de lignes validées accumulées avant chaque écriture groupée en base
+    BATCH_SIZE = int(os.environ.get('IMPORT_CSV_BATCH_SIZE', 1000))
+
+    # Nombre de lots lus et validés à l'avance pendant les écritures en base
+    PREFETCH_BATCHES = 10
+
+    # Longueur maximale de chaque colonne, d'après les champs des modèles qui la reçoivent :
+    # une valeur trop longue ferait échouer tout le lot sur PostgreSQL ou MySQL
+    MAX_LENGTHS = {
+        'client_email': Client._meta.get_field('email').max_length,
+        'client_shop': Client._meta.get_field('shop').max_length,
+        'client_first_name': Client._meta.get_field('first_name').max_length,
+        'client_last_name': Client._meta.get_field('last_name').max_length,
+        'user_email': min(
+            UserClient._meta.get_field('email').max_length,
+            Order._meta.get_field('customer_email').max_length
+        ),
+        'user_name': min(
+            UserClient._meta.get_field('name').max_length,
+            Order._meta.get_field('customer_name').max_length
+        ),
+        'user_last_name': UserClient._meta.get_field('last_name').max_length,
+        'user_location': UserClient._meta.get_field('location').max_length,
+        'order_id': Order._meta.get_field('order_id').max_length,
+    }
+
     def add_arguments(self, parser):
         parser.add_argument(
             'csv_file', 
@@ -46,22 +90,20 @@ class Command(BaseCommand):
 
     def validate_email_address(self, email, field_name, line_number):
         """Valide une adresse email et retourne l'email ou None si invalide"""
-        if not email or not email.strip():
+        email = email.strip() if email else ''
+        if not email:
             return None, f"Ligne {line_number}: {field_name} est vide"
-        
-        email = email.strip()
-        try:
-            validate_email(email)
+
+        if is_valid_email(email):
             return email, None
-        except ValidationError:
-            return None, f"Ligne {line_number}: {field_name} '{email}' n'est pas une adresse email valide"
+        return None, f"Ligne {line_number}: {field_name} '{email}' n'est pas une adresse email valide"
 
-    def validate_columns(self, reader):
-        """Valide que toutes les colonnes requises sont présentes dans le CSV"""
-        if not reader.fieldnames:
+    def validate_columns(self, header):
+        """Valide que toutes les colonnes requises sont présentes dans l'en-tête du CSV"""
+        if not header:
             raise ValueError("Le fichier CSV est vide ou ne contient pas d'en-têtes")
         
-        missing_columns = set(self.REQUIRED_COLUMNS) - set(reader.fieldnames)
+        missing_columns = set(self.REQUIRED_COLUMNS) - set(header)
         if missing_columns:
             raise ValueError(
                 f"Colonnes manquantes dans le CSV : {', '.join(sorted(missing_columns))}. "
@@ -76,13 +118,245 @@ class Command(BaseCommand):
             return None, f"Ligne {line_number}: {field_name} est vide"
         
         try:
-            parsed = json.loads(json_string.strip())
+            parsed = orjson.loads(json_string)
             if not isinstance(parsed, list):
                 return None, f"Ligne {line_number}: {field_name} doit être une liste JSON"
             return parsed, None
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             return None, f"Ligne {line_number}: {field_name} contient du JSON invalide : {str(e)}"
 
+    def insert_rows(self, model, rows, ignore_conflicts=False):
+        """
+        Insère des lignes (dicts indexés par attname) : COPY sur PostgreSQL,
+        requête INSERT préparée exécutée par executemany sur les autres bases.
+        """
+        if supports_copy():
+            copy_insert(model, rows, ignore_conflicts=ignore_conflicts)
+        else:
+            executemany_insert(model, rows, ignore_conflicts=ignore_conflicts)
+
+    def _preload_existing(self, rows):
+        """
+        Charge en une requête par table les clients, utilisateurs et commandes
+        déjà présents en base pour un lot de lignes.
+
+        Returns:
+            tuple: (ids des clients par email, ids des utilisateurs par (email, client),
+                    ids des commandes par (order_id, client))
+        """
+        client_emails = {client_data['email'] for _, client_data, _, _ in rows}
+        user_emails = {user_data['email'] for _, _, user_data, _ in rows}
+        order_ids = {order_data['order_id'] for _, _, _, order_data in rows}
+
+        # Les clients déjà rencontrés lors de l'import ne sont pas recherchés à nouveau
+        client_ids_by_email = {
+            email: self.client_id_cache[email] for email in client_emails if email in self.client_id_cache
+        }
+        unknown_emails = client_emails - client_ids_by_email.keys()
+        if unknown_emails:
+            found = dict(Client.objects.filter(email__in=unknown_emails).values_list('email', 'id'))
+            self.client_id_cache.update(found)
+            client_ids_by_email.update(found)
+        client_ids = list(client_ids_by_email.values())
+
+        user_ids_by_key = {
+            (email, client_id): pk
+            for pk, email, client_id in UserClient.objects.filter(
+                from_client_id__in=client_ids, email__in=user_emails
+            ).values_list('id', 'email', 'from_client_id')
+        }
+        order_ids_by_key = {
+            (order_id, client_id): pk
+            for pk, order_id, client_id in Order.objects.filter(
+                from_client_id__in=client_ids, order_id__in=order_ids
+            ).values_list('id', 'order_id', 'from_client_id')
+        }
+
+        return client_ids_by_email, user_ids_by_key, order_ids_by_key
+
+    def save_batch(self, batch, errors, verbosity):
+        """
+        Enregistre un lot de lignes validées avec des insertions groupées.
+
+        Les clients manquants sont créés en premier, puis les utilisateurs et les
+        commandes qui n'existent pas encore.
+
+        Returns:
+            tuple: (nombre de lignes traitées avec succès, nombre de lignes ignorées)
+        """
+        success_count = 0
+        skipped_count = 0
+
+        client_ids_by_email, user_ids_by_key, order_ids_by_key = self._preload_existing(batch)
+
+        # Phase 1 : clients manquants, un seul par email
+        new_clients = {}
+        for _, client_data, _, _ in batch:
+            if client_data['email'] not in client_ids_by_email:
+                new_clients.setdefault(client_data['email'], client_data)
+
+        if new_clients:
+            self.insert_rows(Client, new_clients.values(), ignore_conflicts=True)
+            created = dict(Client.objects.filter(email__in=list(new_clients)).values_list('email', 'id'))
+            self.client_id_cache.update(created)
+            client_ids_by_email.update(created)
+
+        # Phases 2 et 3 : utilisateurs et commandes manquants
+        users_buf = {}
+        orders_buf = {}
+        rejected_lines = {}
+        for line_number, client_data, user_data, order_data in batch:
+            client_id = client_ids_by_email.get(client_data['email'])
+            if client_id is None:
+                rejected_lines.setdefault(client_data['email'], []).append(line_number)
+                continue
+
+            user_key = (user_data['email'], client_id)
+            if user_key not in user_ids_by_key and user_key not in users_buf:
+                users_buf[user_key] = {**user_data, "from_client_id": client_id}
+
+            order_key = (order_data['order_id'], client_id)
+            if order_key not in order_ids_by_key and order_key not in orders_buf:
+                orders_buf[order_key] = {**order_data, "from_client_id": client_id}
+
+            success_count += 1
+            logger.info("Ligne %s: Traitement réussi - Order %s pour client %s", line_number, order_data['order_id'], client_data['email'])
+
+            if verbosity >= 2:
+                self.stdout.write(f"Traitement : {order_data['order_id']} pour {client_data['email']}")
+
+        # Clients dont l'insertion a été ignorée par la base (ex: boutique déjà associée à un autre email) :
+        # une seule erreur par client, pour toutes ses lignes
+        if rejected_lines:
+            logger.warning("%s client(s) sur %s n'ont pas pu être créés dans ce lot", len(rejected_lines), len(new_clients))
+        for email, line_numbers in rejected_lines.items():
+            error_msg = (
+                f"Ligne {line_numbers[0]}: Erreur d'intégrité de base de données : "
+                f"le client '{email}' (boutique '{new_clients[email]['shop']}') n'a pas pu être créé, "
+                f"{len(line_numbers)} ligne(s) ignorée(s)"
+            )
+            logger.error(error_msg)
+            errors.append(error_msg)
+            skipped_count += len(line_numbers)
+            if verbosity >= 1:
+                self.stdout.write(self.style.ERROR(error_msg))
+
+        self.insert_rows(UserClient, users_buf.values())
+        self.insert_rows(Order, orders_buf.values())
+        logger.debug(
+            "Lot enregistré : %s client(s), %s utilisateur(s) et %s commande(s) créé(s)",
+            len(new_clients), len(users_buf), len(orders_buf)
+        )
+
+        return success_count, skipped_count
+
+    def parse_batches(self, reader, get_columns, row_width, position):
+        """
+        Lit et valide les lignes du CSV, puis les regroupe par lots d'au plus BATCH_SIZE lignes.
+
+        Args:
+            reader: csv.reader positionné après l'en-tête
+            get_columns: Extrait les colonnes requises d'une ligne, dans l'ordre de REQUIRED_COLUMNS
+            row_width: Nombre de colonnes de l'en-tête
+            position: Retourne la position courante (en octets) dans le fichier
+
+        Yields:
+            tuple: (lignes valides, lignes invalides sous forme (numéro, erreurs), position dans le fichier)
+        """
+        valid_rows = []
+        invalid_rows = []
+        for line_number, row in enumerate(filter(None, reader), start=2):  # start=2 car ligne 1 = en-têtes ; les lignes vides sont ignorées
+            if len(row) < row_width:
+                row += [''] * (row_width - len(row))
+            (
+                raw_client_email, client_shop, client_first_name, client_last_name,
+                raw_user_email, user_name, user_last_name, user_location,
+                order_id, raw_product_ids
+            ) = get_columns(row)
+            row_errors = []
+            
+            # Validation des emails
+            client_email, email_error = self.validate_email_address(
+                raw_client_email, 'client_email', line_number
+            )
+            if email_error:
+                row_errors.append(email_error)
+            
+            user_email, email_error = self.validate_email_address(
+                raw_user_email, 'user_email', line_number
+            )
+            if email_error:
+                row_errors.append(email_error)
+            
+            # Validation du champ product_ids (JSON)
+            product_ids, json_error = self.validate_json_field(
+                raw_product_ids, 'product_ids', line_number
+            )
+            if json_error:
+                row_errors.append(json_error)
+            
+            # Validation des champs obligatoires non-email (nettoyés une seule fois)
+            client_shop = clean_value(client_shop)
+            if not client_shop:
+                row_errors.append(f"Ligne {line_number}: client_shop est vide")
+            order_id = order_id.strip()
+            if not order_id:
+                row_errors.append(f"Ligne {line_number}: order_id est vide")
+
+            # Validation des longueurs maximales
+            client_first_name = clean_value(client_first_name)
+            client_last_name = clean_value(client_last_name)
+            user_name = clean_value(user_name)
+            user_last_name = clean_value(user_last_name)
+            user_location = clean_value(user_location)
+            for field_name, value in (
+                ('client_email', client_email), ('client_shop', client_shop),
+                ('client_first_name', client_first_name), ('client_last_name', client_last_name),
+                ('user_email', user_email), ('user_name', user_name),
+                ('user_last_name', user_last_name), ('user_location', user_location),
+                ('order_id', order_id)
+            ):
+                max_length = self.MAX_LENGTHS[field_name]
+                if value and len(value) > max_length:
+                    row_errors.append(
+                        f"Ligne {line_number}: {field_name} est trop long "
+                        f"({len(value)} caractères, maximum {max_length})"
+                    )
+            
+            if row_errors:
+                invalid_rows.append((line_number, row_errors))
+            else:
+                valid_rows.append((
+                    line_number,
+                    {
+                        "email": client_email,
+                        "shop": client_shop,
+                        "first_name": client_first_name,
+                        "last_name": client_last_name
+                    },
+                    {
+                        "email": user_email,
+                        "name": user_name,
+                        "last_name": user_last_name,
+                        "location": user_location
+                    },
+                    {
+                        "order_id": order_id,
+                        "product_id": product_ids,
+                        "customer_email": user_email,
+                        "customer_name": user_name,
+                        "mail_sent": False,
+                        "mail_sent_at": None
+                    }
+                ))
+
+            if len(valid_rows) + len(invalid_rows) >= self.BATCH_SIZE:
+                yield valid_rows, invalid_rows, position()
+                valid_rows = []
+                invalid_rows = []
+
+        yield valid_rows, invalid_rows, position()
+
     def handle(self, *args, **options): #Gère l'importation des données en CSV avec différents arguments
         file_path = options['csv_file']
         dry_run = options['dry_run']
@@ -105,173 +379,112 @@ class Command(BaseCommand):
         errors = []
         success_count = 0
         skipped_count = 0
+        # Ids des clients par email, conservés d'un lot à l'autre
+        self.client_id_cache = {}
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
+            # Lecture en un seul passage, avec un tampon de lecture élargi ;
+            # la progression (en octets lus) est mise à jour après chaque lot
+            with open(file_path, 'r', encoding='utf-8', buffering=1024 * 1024) as file, \
+                    tqdm(total=os.path.getsize(file_path), unit='B', unit_scale=True, mininterval=0.5, desc="Import") as progress:
+                reader = csv.reader(file)
+                header = next(reader, None)
                 
                 # Valider les colonnes avant de traiter les données
                 try:
-                    self.validate_columns(reader)
+                    self.validate_columns(header)
                     logger.info("Validation des colonnes réussie")
                 except ValueError as e:
                     error_msg = f"Erreur de validation des colonnes : {e}"
                     logger.error(error_msg)
                     self.stdout.write(self.style.ERROR(error_msg))
                     return
+
+                # Extraction des colonnes requises par position, dans l'ordre de REQUIRED_COLUMNS
+                get_columns = itemgetter(*[header.index(column) for column in self.REQUIRED_COLUMNS])
+                row_width = len(header)
                 
-                # Compter les lignes de données (sans l'en-tête)
-                total_lines = sum(1 for _ in file) - 1
-                file.seek(0)
-                reader = csv.DictReader(file)  # Réinitialiser le reader
-                
-                if total_lines > 0:
-                    logger.info(f"Colonnes validées. Début du traitement de {total_lines} ligne(s) de données")
-                    self.stdout.write(self.style.SUCCESS(f"Colonnes validées. Début du traitement de {total_lines} ligne(s) de données..."))
-                else:
-                    warning_msg = "Le fichier CSV ne contient aucune ligne de données (seulement les en-têtes)."
-                    logger.warning(warning_msg)
-                    self.stdout.write(self.style.WARNING(warning_msg))
-                    return
+                logger.info("Colonnes validées. Début du traitement des lignes de données")
+                self.stdout.write(self.style.SUCCESS("Colonnes validées. Début du traitement des lignes de données..."))
 
-                with transaction.atomic():
-                    for line_number, row in enumerate(tqdm(reader, total=total_lines, desc="Import"), start=2):  # start=2 car ligne 1 = en-têtes
-                        row_errors = []
-                        
-                        # Validation des emails
-                        client_email, email_error = self.validate_email_address(
-                            row.get('client_email'), 'client_email', line_number
-                        )
-                        if email_error:
-                            row_errors.append(email_error)
-                        
-                        user_email, email_error = self.validate_email_address(
-                            row.get('user_email'), 'user_email', line_number
-                        )
-                        if email_error:
-                            row_errors.append(email_error)
-                        
-                        # Validation du champ product_ids (JSON)
-                        product_ids, json_error = self.validate_json_field(
-                            row.get('product_ids'), 'product_ids', line_number
-                        )
-                        if json_error:
-                            row_errors.append(json_error)
-                        
-                        # Validation des champs obligatoires non-email
-                        required_fields = {
-                            'client_shop': row.get('client_shop'),
-                            'order_id': row.get('order_id'),
-                        }
-                        
-                        for field_name, field_value in required_fields.items():
-                            if not field_value or not field_value.strip():
-                                row_errors.append(f"Ligne {line_number}: {field_name} est vide")
-                        
-                        # Si des erreurs de validation, on skip cette ligne
-                        if row_errors:
+                # Une seule transaction pour tout l'import, sans points de sauvegarde intermédiaires.
+                # La lecture et la validation du CSV se font dans un thread séparé, qui prépare
+                # les lots suivants pendant que le thread principal écrit le lot courant en base.
+                batches = iterate_in_thread(
+                    self.parse_batches(reader, get_columns, row_width, file.buffer.tell),
+                    maxsize=self.PREFETCH_BATCHES
+                )
+                with transaction.atomic(savepoint=False), closing(batches):
+                    row_count = 0
+                    for valid_rows, invalid_rows, position in batches:
+                        row_count += len(valid_rows) + len(invalid_rows)
+
+                        # Lignes ignorées suite à des erreurs de validation
+                        for line_number, row_errors in invalid_rows:
                             errors.extend(row_errors)
                             skipped_count += 1
                             error_details = '; '.join(row_errors)
-                            logger.warning(f"Ligne {line_number} ignorée : {error_details}")
+                            logger.warning("Ligne %s ignorée : %s", line_number, error_details)
                             if verbosity >= 1:
                                 self.stdout.write(self.style.WARNING(f"Ligne {line_number} ignorée : {error_details}"))
-                            continue
-                        
-                        # Traitement de la ligne si toutes les validations passent
-                        try:
-                            client, client_created = Client.objects.get_or_create(
-                                email=client_email,
-                                defaults={
-                                    "shop": row['client_shop'].strip(), 
-                                    "first_name": row.get('client_first_name', '').strip(), 
-                                    "last_name": row.get('client_last_name', '').strip()
-                                }
-                            )
-                            if client_created:
-                                logger.debug(f"Ligne {line_number}: Client créé - {client_email}")
-                            else:
-                                logger.debug(f"Ligne {line_number}: Client existant - {client_email}")
-                            
-                            user_client, user_created = UserClient.objects.get_or_create(
-                                email=user_email,
-                                from_client=client,
-                                defaults={
-                                    "name": row.get('user_name', '').strip(),
-                                    "last_name": row.get('user_last_name', '').strip(),
-                                    "location": row.get('user_location', '').strip(),
-                                    "from_client": client
-                                }
-                            )
-                            if user_created:
-                                logger.debug(f"Ligne {line_number}: UserClient créé - {user_email}")
-                            
-                            order, order_created = Order.objects.get_or_create(
-                                order_id=row['order_id'].strip(),
-                                from_client=client,
-                                defaults={
-                                    "product_id": product_ids,
-                                    "customer_email": user_email,
-                                    "customer_name": row.get('user_name', '').strip(),
-                                    "mail_sent": False,
-                                    "mail_sent_at": None
-                                }
-                            )
-                            if order_created:
-                                logger.debug(f"Ligne {line_number}: Commande créée - {order.order_id}")
-                            
-                            success_count += 1
-                            logger.info(f"Ligne {line_number}: Traitement réussi - Order {order.order_id} pour client {client.email}")
-                            
-                            if verbosity >= 2:
-                                self.stdout.write(f"Traitement : {order.order_id} pour {client.email}")
-                        
-                        except IntegrityError as e:
-                            error_msg = f"Ligne {line_number}: Erreur d'intégrité de base de données : {str(e)}"
-                            logger.error(error_msg, exc_info=True)
-                            errors.append(error_msg)
-                            skipped_count += 1
-                            if verbosity >= 1:
-                                self.stdout.write(self.style.ERROR(error_msg))
-                        
-                        except Exception as e:
-                            error_msg = f"Ligne {line_number}: Erreur inattendue : {str(e)}"
-                            logger.error(error_msg, exc_info=True)
-                            errors.append(error_msg)
-                            skipped_count += 1
-                            if verbosity >= 1:
-                                self.stdout.write(self.style.ERROR(error_msg))
+
+                        if valid_rows:
+                            saved, skipped = self.save_batch(valid_rows, errors, verbosity)
+                            success_count += saved
+                            skipped_count += skipped
+                        progress.update(position - progress.n)
+
+                    if row_count == 0:
+                        warning_msg = "Le fichier CSV ne contient aucune ligne de données (seulement les en-têtes)."
+                        logger.warning(warning_msg)
+                        self.stdout.write(self.style.WARNING(warning_msg))
+                        return
+
+                    # Le rollback doit être demandé dans le bloc atomic pour annuler les écritures
+                    if dry_run:
+                        logger.info("Dry-run: Rollback de la transaction")
+                        transaction.set_rollback(True)
 
                 if dry_run:
-                    logger.info("Dry-run: Rollback de la transaction")
-                    raise Exception("DryRunRollback")
-                else:
-                    # Afficher le résumé
-                    logger.info(f"Import terminé - Succès: {success_count}, Ignorées: {skipped_count}, Erreurs: {len(errors)}")
+                    # Afficher le résumé même en dry-run
+                    logger.info(f"Simulation terminée - Succès: {success_count}, Ignorées: {skipped_count}, Erreurs: {len(errors)}")
                     self.stdout.write(self.style.SUCCESS("\n" + "="*60))
-                    self.stdout.write(self.style.SUCCESS("Résumé de l'import :"))
-                    self.stdout.write(self.style.SUCCESS(f"  ✓ Lignes traitées avec succès : {success_count}"))
+                    self.stdout.write(self.style.SUCCESS("Résumé de la simulation :"))
+                    self.stdout.write(self.style.SUCCESS(f"  ✓ Lignes qui auraient été traitées : {success_count}"))
                     if skipped_count > 0:
-                        logger.warning(f"{skipped_count} ligne(s) ignorée(s) lors de l'import")
-                        self.stdout.write(self.style.WARNING(f"  ⚠ Lignes ignorées : {skipped_count}"))
+                        self.stdout.write(self.style.WARNING(f"  ⚠ Lignes qui auraient été ignorées : {skipped_count}"))
                     if errors:
-                        logger.error(f"{len(errors)} erreur(s) rencontrée(s) lors de l'import")
                         self.stdout.write(self.style.ERROR(f"  ✗ Erreurs rencontrées : {len(errors)}"))
                     self.stdout.write(self.style.SUCCESS("="*60))
-                    
-                    if errors and verbosity >= 1:
-                        self.stdout.write(self.style.ERROR("\nDétails des erreurs :"))
-                        for error in errors[:20]:  # Limiter à 20 erreurs pour la lisibilité
-                            self.stdout.write(self.style.ERROR(f"  - {error}"))
-                        if len(errors) > 20:
-                            self.stdout.write(self.style.ERROR(f"  ... et {len(errors) - 20} erreur(s) supplémentaire(s)"))
-                    
-                    if success_count > 0:
-                        logger.info("Import terminé avec succès")
-                        self.stdout.write(self.style.SUCCESS("\nImport terminé avec succès ! 🚀"))
-                    elif skipped_count > 0:
-                        logger.warning("Aucune ligne n'a pu être importée")
-                        self.stdout.write(self.style.WARNING("\nAucune ligne n'a pu être importée. Vérifiez les erreurs ci-dessus."))
+                    self.stdout.write(self.style.SUCCESS("\nSimulation terminée. La base de données est restée intacte. 🧹"))
+                    return
+
+                # Afficher le résumé
+                logger.info(f"Import terminé - Succès: {success_count}, Ignorées: {skipped_count}, Erreurs: {len(errors)}")
+                self.stdout.write(self.style.SUCCESS("\n" + "="*60))
+                self.stdout.write(self.style.SUCCESS("Résumé de l'import :"))
+                self.stdout.write(self.style.SUCCESS(f"  ✓ Lignes traitées avec succès : {success_count}"))
+                if skipped_count > 0:
+                    logger.warning(f"{skipped_count} ligne(s) ignorée(s) lors de l'import")
+                    self.stdout.write(self.style.WARNING(f"  ⚠ Lignes ignorées : {skipped_count}"))
+                if errors:
+                    logger.error(f"{len(errors)} erreur(s) rencontrée(s) lors de l'import")
+                    self.stdout.write(self.style.ERROR(f"  ✗ Erreurs rencontrées : {len(errors)}"))
+                self.stdout.write(self.style.SUCCESS("="*60))
+                
+                if errors and verbosity >= 1:
+                    self.stdout.write(self.style.ERROR("\nDétails des erreurs :"))
+                    for error in errors[:20]:  # Limiter à 20 erreurs pour la lisibilité
+                        self.stdout.write(self.style.ERROR(f"  - {error}"))
+                    if len(errors) > 20:
+                        self.stdout.write(self.style.ERROR(f"  ... et {len(errors) - 20} erreur(s) supplémentaire(s)"))
+                
+                if success_count > 0:
+                    logger.info("Import terminé avec succès")
+                    self.stdout.write(self.style.SUCCESS("\nImport terminé avec succès ! 🚀"))
+                elif skipped_count > 0:
+                    logger.warning("Aucune ligne n'a pu être importée")
+                    self.stdout.write(self.style.WARNING("\nAucune ligne n'a pu être importée. Vérifiez les erreurs ci-dessus."))
 
         except FileNotFoundError:
             error_msg = f"Le fichier '{file_path}' est introuvable."
@@ -286,23 +499,10 @@ class Command(BaseCommand):
             logger.error(error_msg, exc_info=True)
             self.stdout.write(self.style.ERROR(f"Erreur : {error_msg}"))
         except Exception as e:
-            if str(e) == "DryRunRollback":
-                # Afficher le résumé même en dry-run
-                logger.info(f"Simulation terminée - Succès: {success_count}, Ignorées: {skipped_count}, Erreurs: {len(errors)}")
-                self.stdout.write(self.style.SUCCESS("\n" + "="*60))
-                self.stdout.write(self.style.SUCCESS("Résumé de la simulation :"))
-                self.stdout.write(self.style.SUCCESS(f"  ✓ Lignes qui auraient été traitées : {success_count}"))
-                if skipped_count > 0:
-                    self.stdout.write(self.style.WARNING(f"  ⚠ Lignes qui auraient été ignorées : {skipped_count}"))
-                if errors:
-                    self.stdout.write(self.style.ERROR(f"  ✗ Erreurs rencontrées : {len(errors)}"))
-                self.stdout.write(self.style.SUCCESS("="*60))
-                self.stdout.write(self.style.SUCCESS("\nSimulation terminée. La base de données est restée intacte. 🧹"))
-            else:
-                error_msg = f"Une erreur inattendue est survenue : {e}"
-                logger.exception(error_msg)
-                self.stdout.write(self.style.ERROR(error_msg))
-                if verbosity >= 2:
-                    import traceback
-                    self.stdout.write(self.style.ERROR(traceback.format_exc()))
-                raise e
\ No newline at end of file
+            error_msg = f"Une erreur inattendue est survenue : {e}"
+            logger.exception(error_msg)
+            self.stdout.write(self.style.ERROR(error_msg))
+            if verbosity >= 2:
+                import traceback
+                self.stdout.write(self.style.ERROR(traceback.format_exc()))
+            raise e
\ No newline at end of file
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-15 21:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userclient',
+            index=models.Index(fields=['email', 'from_client'], name='userclient_email_client_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-15 21:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_userclient_userclient_email_client_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='client',
+            options={},
+        ),
+        migrations.AlterModelOptions(
+            name='userclient',
+            options={},
+        ),
+    ]
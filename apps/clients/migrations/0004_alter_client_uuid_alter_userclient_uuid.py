@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-15 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0003_alter_client_options_alter_userclient_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='uuid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='userclient',
+            name='uuid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+    ]
@@ -21,4 +21,9 @@ class UserClient(BaseModel):
         null = True,
         blank = True,
         related_name = "users"
-    )
\ No newline at end of file
+    )
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=['email', 'from_client'], name='userclient_email_client_idx'),
+        ]
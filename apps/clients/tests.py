@@ -1,5 +1,12 @@
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from apps.clients.management.commands.import_csv import Command as ImportCsvCommand
 from apps.clients.models import Client, UserClient
+from apps.orders.models import Order
+from io import StringIO
+from unittest import mock
+import os
+import tempfile
 
 class ClientTest(TestCase):
     def test_client_creation(self):
@@ -26,4 +33,118 @@ class ClientTest(TestCase):
             from_client=client
         )
         self.assertEqual(user_client.email, "test@test.com")
-        self.assertEqual(user_client.from_client, client)
\ No newline at end of file
+        self.assertEqual(user_client.from_client, client)
+
+
+class ImportCsvMixin:
+    HEADER = "client_email,client_shop,client_first_name,client_last_name,user_email,user_name,user_last_name,user_location,order_id,product_ids\n"
+
+    def run_import(self, content, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as file:
+            file.write(self.HEADER + content)
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        call_command('import_csv', file.name, *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+
+class ImportCsvCommandTest(ImportCsvMixin, TestCase):
+    def test_import_creates_clients_users_and_orders(self):
+        self.run_import(
+            'shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123, 456]"\n'
+            'shop@example.com,my-store,John,Doe,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n'
+        )
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(UserClient.objects.count(), 2)
+        self.assertEqual(Order.objects.count(), 2)
+        order = Order.objects.get(order_id="ORD-001")
+        self.assertEqual(order.from_client.email, "shop@example.com")
+        self.assertEqual(order.product_id, [123, 456])
+
+    def test_reimport_does_not_duplicate(self):
+        content = (
+            'shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n'
+            'shop@example.com,my-store,John,Doe,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n'
+        )
+        self.run_import(content)
+        self.run_import(content)
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(UserClient.objects.count(), 2)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_invalid_rows_are_skipped(self):
+        output = self.run_import(
+            'not-an-email,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n'
+            'shop@example.com,my-store,John,Doe,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n'
+        )
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertIn("Lignes ignorées : 1", output)
+
+    def test_too_long_values_are_skipped(self):
+        output = self.run_import(
+            f'shop@example.com,my-store,{"J" * 51},Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n'
+            f'shop@example.com,{"s" * 256},John,Doe,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n'
+            'shop@example.com,my-store,John,Doe,customer3@example.com,Carl,Durand,Nice,ORD-003,"[456]"\n'
+        )
+        self.assertEqual(Order.objects.get().order_id, "ORD-003")
+        self.assertIn("Lignes ignorées : 2", output)
+        self.assertIn("client_first_name est trop long (51 caractères, maximum 50)", output)
+        self.assertIn("client_shop est trop long", output)
+
+    def test_conflicting_client_rows_are_skipped(self):
+        output = self.run_import(
+            'shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n'
+            'other@example.com,my-store,Jane,Smith,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n'
+            'other@example.com,my-store,Jane,Smith,customer3@example.com,Carl,Durand,Nice,ORD-003,"[789]"\n'
+        )
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertIn("Lignes ignorées : 2", output)
+        self.assertIn("Erreurs rencontrées : 1", output)
+
+    def test_rows_split_across_batches(self):
+        with mock.patch.object(ImportCsvCommand, 'BATCH_SIZE', 1):
+            self.run_import(
+                'shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n'
+                'shop@example.com,my-store,John,Doe,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n'
+                'shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-003,"[456]"\n'
+            )
+        self.assertEqual(Client.objects.count(), 1)
+        self.assertEqual(UserClient.objects.count(), 2)
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_single_row_file_is_imported(self):
+        self.run_import('shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_header_only_file(self):
+        output = self.run_import('')
+        self.assertIn("ne contient aucune ligne de données", output)
+        self.assertEqual(Client.objects.count(), 0)
+
+
+class ImportCsvTransactionTest(ImportCsvMixin, TransactionTestCase):
+    # L'import doit être la transaction la plus externe pour que ses rollbacks s'appliquent
+
+    def test_dry_run_does_not_save(self):
+        self.run_import(
+            'shop@example.com,my-store,John,Doe,customer1@example.com,Alice,Martin,Paris,ORD-001,"[123]"\n'
+            'shop@example.com,my-store,John,Doe,customer2@example.com,Bob,Dupont,Lyon,ORD-002,"[789]"\n',
+            '--dry-run'
+        )
+        self.assertEqual(Client.objects.count(), 0)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_invalid_encoding_is_reported(self):
+        # L'erreur de décodage survient dans le thread de lecture, après les premiers lots
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as file:
+            file.write(self.HEADER.encode('utf-8'))
+            for i in range(200):
+                file.write(f'shop@example.com,my-store,John,Doe,customer{i}@example.com,Alice,Martin,Paris,ORD-{i},"[123]"\n'.encode('utf-8'))
+            file.write('shop@example.com,my-store,Jérôme,Doe,customer1@example.com,Alice,Martin,Paris,ORD-X,"[123]"\n'.encode('latin-1'))
+        self.addCleanup(os.remove, file.name)
+        out = StringIO()
+        with mock.patch.object(ImportCsvCommand, 'BATCH_SIZE', 50):
+            call_command('import_csv', file.name, stdout=out, stderr=StringIO())
+        self.assertIn("Impossible de décoder le fichier", out.getvalue())
+        self.assertEqual(Client.objects.count(), 0)
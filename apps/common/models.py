@@ -1,12 +1,10 @@
 from django.db import models
-import uuid
 
 class BaseModel(models.Model):
     id = models.AutoField(primary_key=True)
-    uuid = models.UUIDField(default=uuid.uuid4, null=True)
+    uuid = models.UUIDField(null=True, editable=False)  # Non renseigné automatiquement
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        abstract = True
-        ordering = ["-created_at"]
\ No newline at end of file
+        abstract = True
\ No newline at end of file
@@ -1,3 +1,69 @@
-from django.test import TestCase
+from django.db import models
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import isolate_apps
+from apps.clients.models import Client
+from apps.common.utils import _prepare_rows, copy_insert, supports_copy
+from apps.common.validators import is_valid_email
+from apps.orders.models import Order
+from unittest import skipUnless
+import uuid
 
-# Create your tests here.
+
+def make_callable_default_model():
+    """Déclare un modèle à défauts appelables ; à appeler sous isolate_apps pour ne pas l'enregistrer dans l'app"""
+    class CallableDefaultModel(models.Model):
+        token = models.UUIDField(default=uuid.uuid4)
+        label = models.CharField(max_length=50, default="")
+
+        class Meta:
+            app_label = 'common'
+            managed = False
+
+    return CallableDefaultModel
+
+
+class IsValidEmailTest(SimpleTestCase):
+    def test_common_addresses_are_valid(self):
+        self.assertTrue(is_valid_email("customer@example.com"))
+        self.assertTrue(is_valid_email("first.last+tag@sub.example.fr"))
+
+    def test_invalid_addresses_are_rejected(self):
+        for email in ("", None, "not-an-email", "john doe@example.com", "customer@example.com\n"):
+            with self.subTest(email=email):
+                self.assertFalse(is_valid_email(email))
+
+    def test_falls_back_to_django_validator(self):
+        # Sans point dans le domaine : refusée par EMAIL_RE, acceptée par validate_email
+        self.assertTrue(is_valid_email("admin@localhost"))
+
+
+@isolate_apps('apps.common')
+class PrepareRowsTest(SimpleTestCase):
+    def test_callable_defaults_are_computed_per_row(self):
+        fields, values = _prepare_rows(make_callable_default_model(), [{}, {}, {'label': "x"}])
+        token_index = [field.name for field in fields].index('token')
+        self.assertEqual(len({row[token_index] for row in values}), 3)
+
+    def test_given_values_take_precedence_over_defaults(self):
+        token = uuid.uuid4()
+        fields, values = _prepare_rows(make_callable_default_model(), [{'token': token, 'label': "x"}])
+        self.assertEqual(dict(zip([field.name for field in fields], values[0])), {'token': token.hex, 'label': "x"})
+
+
+@skipUnless(supports_copy(), "COPY n'est disponible qu'avec PostgreSQL et psycopg 3")
+class CopyInsertTest(TestCase):
+    def test_inserts_rows_and_ignores_conflicts(self):
+        client_row = {'email': "shop@example.com", 'shop': "my-store", 'first_name': "John", 'last_name': "Doe"}
+        copy_insert(Client, [client_row])
+        # Passe par la table temporaire et INSERT ... ON CONFLICT DO NOTHING
+        copy_insert(Client, [client_row, {**client_row, 'email': "other@example.com", 'shop': "other-store"}],
+                    ignore_conflicts=True)
+        self.assertEqual(Client.objects.count(), 2)
+
+    def test_json_values_are_copied(self):
+        client = Client.objects.create(email="shop@example.com", shop="my-store", first_name="John", last_name="Doe")
+        copy_insert(Order, [{
+            'order_id': "ORD-001", 'product_id': [123, 456], 'customer_email': "customer@example.com",
+            'customer_name': "Alice", 'from_client_id': client.pk,
+        }])
+        self.assertEqual(Order.objects.get().product_id, [123, 456])
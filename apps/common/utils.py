@@ -0,0 +1,174 @@
+from django.db import connection
+from django.db.models.constants import OnConflict
+from django.utils import timezone
+from functools import lru_cache
+import queue
+import threading
+
+
+def supports_copy():
+    """Indique si la base courante permet les insertions par COPY (PostgreSQL avec psycopg 3)"""
+    if connection.vendor != 'postgresql':
+        return False
+
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def _insert_fields(model):
+    """Champs renseignés lors d'une insertion (tous sauf la clé primaire auto-incrémentée)"""
+    return [field for field in model._meta.concrete_fields if not field.primary_key]
+
+
+@lru_cache(maxsize=None)
+def _insert_sql(model, ignore_conflicts):
+    """Construit une seule fois la requête INSERT paramétrée d'un modèle"""
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    fields = _insert_fields(model)
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    suffix = connection.ops.on_conflict_suffix_sql(fields, on_conflict, None, None)
+    return (
+        f"{connection.ops.insert_statement(on_conflict=on_conflict)} {quote_name(model._meta.db_table)} "
+        f"({columns}) VALUES ({placeholders}) {suffix}"
+    ).strip()
+
+
+def _prepare_rows(model, rows):
+    """
+    Convertit des dicts en tuples de valeurs prêtes pour la base, sans instancier de modèle.
+
+    Les champs absents des dicts reçoivent leur valeur par défaut, les champs
+    auto_now / auto_now_add la date courante.
+
+    Returns:
+        tuple: (liste des champs insérés, liste des tuples de valeurs)
+    """
+    now = timezone.now()
+    fields = _insert_fields(model)
+    # (champ, valeur par défaut, défaut à recalculer pour chaque ligne)
+    columns = []
+    for field in fields:
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            columns.append((field, now, False))
+        elif field.has_default() and callable(field.default):
+            # Défaut appelable (ex: uuid4) : une valeur différente par ligne
+            columns.append((field, field.get_default, True))
+        else:
+            columns.append((field, field.get_default(), False))
+
+    values = [
+        tuple(
+            field.get_db_prep_save(
+                row[field.attname] if field.attname in row else (default() if per_row else default),
+                connection,
+            )
+            for field, default, per_row in columns
+        )
+        for row in rows
+    ]
+    return fields, values
+
+
+def copy_insert(model, rows, ignore_conflicts=False):
+    """
+    Insère des lignes avec COPY FROM STDIN (PostgreSQL avec psycopg 3 uniquement).
+
+    Args:
+        model: Modèle Django cible
+        rows: Dicts {attname du champ: valeur}, un par ligne à insérer
+        ignore_conflicts: Ignore les lignes qui violent une contrainte d'unicité ;
+            COPY ne le permet pas directement, les lignes passent alors par une
+            table temporaire puis un INSERT ... ON CONFLICT DO NOTHING
+    """
+    fields, values = _prepare_rows(model, rows)
+    if not values:
+        return
+
+    quote_name = connection.ops.quote_name
+    table = quote_name(model._meta.db_table)
+    columns = ', '.join(quote_name(field.column) for field in fields)
+
+    with connection.cursor() as cursor:
+        target = table
+        if ignore_conflicts:
+            target = quote_name(f"{model._meta.db_table}_copy")
+            cursor.execute(f"CREATE TEMPORARY TABLE {target} AS SELECT {columns} FROM {table} WITH NO DATA")
+
+        with cursor.copy(f"COPY {target} ({columns}) FROM STDIN") as copy:
+            for row in values:
+                copy.write_row(row)
+
+        if ignore_conflicts:
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {target} ON CONFLICT DO NOTHING"
+            )
+            cursor.execute(f"DROP TABLE {target}")
+
+
+def executemany_insert(model, rows, ignore_conflicts=False):
+    """
+    Insère des lignes avec une seule requête paramétrée exécutée par executemany,
+    sans passer par la compilation SQL de bulk_create à chaque appel.
+
+    Args:
+        model: Modèle Django cible
+        rows: Dicts {attname du champ: valeur}, un par ligne à insérer
+        ignore_conflicts: Ignore les lignes qui violent une contrainte d'unicité
+    """
+    _, values = _prepare_rows(model, rows)
+    if not values:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.executemany(_insert_sql(model, ignore_conflicts), values)
+
+
+_END = object()
+
+
+def iterate_in_thread(iterable, maxsize=10):
+    """
+    Parcourt un itérable dans un thread séparé et restitue ses éléments au fil de l'eau.
+
+    Le thread prend jusqu'à `maxsize` éléments d'avance, ce qui permet de recouvrir la
+    production des éléments (lecture, parsing) et leur traitement (écritures en base).
+    Une exception levée par l'itérable est relancée côté consommateur ; fermer le
+    générateur (ex: contextlib.closing) arrête le thread.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((_END, e))
+        else:
+            put((_END, None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
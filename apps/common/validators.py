@@ -0,0 +1,32 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+import re
+
+# Forme générale d'une adresse email ; syntaxe commune à Python, PostgreSQL et SQLite
+# pour pouvoir aussi filtrer en base (lookup __regex). \Z plutôt que $, qui accepterait
+# un saut de ligne final avec re.search (SQLite)
+EMAIL_PATTERN = r'^[^@\s]+@[^@\s]+\.[^@\s]+\Z'
+EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+# Adresses sans point dans le domaine (ex: admin@localhost) : les seules refusées par
+# EMAIL_PATTERN que validate_email peut encore accepter
+DOTLESS_DOMAIN_EMAIL_PATTERN = r'^[^@\s]+@[^@\s.]+\Z'
+
+
+def is_valid_email(email):
+    """
+    Indique si une adresse email est valide, sans lever d'exception.
+
+    Les adresses courantes sont acceptées par EMAIL_RE ; validate_email n'est appelé que
+    pour les autres (domaines autorisés sans point comme localhost...).
+    """
+    if not email:
+        return False
+    if EMAIL_RE.fullmatch(email):
+        return True
+
+    try:
+        validate_email(email)
+    except ValidationError:
+        return False
+    return True
@@ -1,18 +1,47 @@
+from django.core.mail import get_connection
 from django.core.management.base import BaseCommand
-from django.core.validators import validate_email
-from django.core.exceptions import ValidationError
-from django.db import transaction, IntegrityError
+from django.db import connection, transaction
+from django.db.models import Q
+from apps.common.validators import DOTLESS_DOMAIN_EMAIL_PATTERN, EMAIL_PATTERN, is_valid_email
 from apps.orders.models import Order
 from apps.orders.utils import send_review_request_email
 from django.utils import timezone
 from tqdm import tqdm
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+
 class Command(BaseCommand):
     help = 'Envoie les emails de demande d\'avis aux clients pour les commandes non traitées'
 
+    # Nombre de commandes lues par requête, confiées ensemble au pool d'envoi,
+    # et marquées comme envoyées par écriture groupée
+    FETCH_CHUNK_SIZE = 2000
+    SEND_BATCH_SIZE = 500
+    UPDATE_BATCH_SIZE = 5000
+
+    # Fréquence (en commandes) des messages de progression quand la barre tqdm n'est pas affichée
+    PROGRESS_INTERVAL = 1000
+
+    # Nombre de lignes de détail accumulées avant d'être écrites ensemble sur la sortie
+    OUTPUT_BUFFER_SIZE = 1000
+
+    # Nombre maximum de commandes ignorées détaillées dans le rapport, et d'erreurs conservées
+    # pour le résumé final (seules les plus récentes sont gardées en mémoire)
+    MAX_REPORTED_SKIPS = 20
+    MAX_REPORTED_ERRORS = 20
+
+    # Nombre d'emails envoyés en parallèle (l'envoi SMTP est limité par le réseau, pas par le CPU)
+    MAX_WORKERS = int(os.environ.get('REVIEW_EMAILS_MAX_WORKERS', 16))
+
+    # File Celery dédiée aux emails (mode --async)
+    EMAIL_QUEUE = 'email_queue'
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
@@ -25,11 +54,152 @@ class Command(BaseCommand):
             default=None,
             help='Limite le nombre d\'emails à envoyer (utile pour les tests)'
         )
+        parser.add_argument(
+            '--async',
+            action='store_true',
+            dest='use_async',
+            help='Confie l\'envoi des emails à des workers Celery (file email_queue) au lieu de les envoyer depuis la commande'
+        )
+
+    def send_email_in_thread(self, order):
+        """
+        Envoie l'email depuis un thread du pool puis libère la connexion à la base de ce thread.
+
+        Chaque thread garde sa propre connexion SMTP ouverte pendant toute la commande
+        (le backend SMTP verrouille sa connexion pendant un envoi, une connexion partagée
+        sérialiserait les threads) : la négociation EHLO/STARTTLS/AUTH n'a lieu qu'une fois par thread.
+        """
+        email_connection = getattr(self.thread_state, 'email_connection', None)
+        try:
+            if email_connection is None:
+                email_connection = get_connection()
+                email_connection.open()
+                self.thread_state.email_connection = email_connection
+                self.email_connections.append(email_connection)
+
+            sent = send_review_request_email(order, connection=email_connection)
+            if not sent:
+                # La connexion a pu être coupée par le serveur : elle sera rouverte au prochain envoi
+                self.discard_email_connection(email_connection)
+            return sent
+        except OSError as e:
+            # Serveur SMTP injoignable (smtplib.SMTPException hérite d'OSError) : la commande est
+            # comptée en échec, comme un envoi refusé, au lieu d'interrompre toute la commande
+            logger.warning(f"Connexion SMTP impossible pour la commande {order.order_id} : {e}")
+            if email_connection is not None:
+                self.discard_email_connection(email_connection)
+            return False
+        finally:
+            connection.close()
+
+    def discard_email_connection(self, email_connection):
+        """Ferme la connexion SMTP du thread courant ; une nouvelle sera ouverte au prochain envoi"""
+        self.thread_state.email_connection = None
+        self.close_email_connection(email_connection)
+
+    def close_email_connection(self, email_connection):
+        """Ferme une connexion SMTP sans propager les erreurs réseau"""
+        try:
+            email_connection.close()
+        except OSError as e:
+            logger.warning(f"Fermeture de la connexion SMTP impossible : {e}")
+
+    def write_buffered(self, line):
+        """Ajoute une ligne de détail à la sortie, écrite par paquets de OUTPUT_BUFFER_SIZE lignes"""
+        self.output_buffer.append(line)
+        if len(self.output_buffer) >= self.OUTPUT_BUFFER_SIZE:
+            self.flush_output()
+
+    def flush_output(self):
+        """Écrit les lignes de détail en attente"""
+        if self.output_buffer:
+            self.stdout.write("\n".join(self.output_buffer))
+            self.output_buffer = []
+
+    def close_email_connections(self):
+        """Ferme les connexions SMTP ouvertes par les threads d'envoi"""
+        for email_connection in self.email_connections:
+            self.close_email_connection(email_connection)
+        self.email_connections = []
+
+    def disable_synchronous_commit(self):
+        """
+        Sur PostgreSQL, n'attend pas l'écriture du WAL sur disque au commit de la transaction courante.
+
+        Seuls les derniers marquages mail_sent peuvent être perdus en cas d'arrêt brutal du serveur,
+        la base restant cohérente.
+        """
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL synchronous_commit = OFF")
+
+    def mark_sent(self, order_ids):
+        """
+        Enregistre mail_sent / mail_sent_at (et updated_at) pour un lot de commandes en une requête.
+
+        Les valeurs sont les mêmes pour tout le lot : un UPDATE ... WHERE id IN (...) suffit,
+        là où bulk_update générerait un CASE WHEN par commande et par champ. update()
+        n'applique pas auto_now : updated_at est renseigné explicitement.
+        """
+        if order_ids:
+            now = timezone.now()
+            Order.objects.filter(pk__in=order_ids).update(
+                mail_sent=True, mail_sent_at=now, updated_at=now
+            )
+
+    def send_batch(self, executor, orders, errors, verbosity):
+        """
+        Envoie en parallèle les emails d'un lot de commandes.
+
+        Returns:
+            tuple: (ids des commandes envoyées, à marquer en base, nombre d'échecs)
+        """
+        sent_ids = []
+        failed_count = 0
+        write = self.write_buffered
+        success_style = self.style.SUCCESS
+        error_style = self.style.ERROR
+
+        for order, sent in zip(orders, executor.map(self.send_email_in_thread, orders)):
+            if sent:
+                sent_ids.append(order.pk)
+                logger.info(f"Email envoyé avec succès pour la commande {order.order_id} à {order.customer_email}")
+                if verbosity >= 2:
+                    write(success_style(f"✓ Email envoyé à {order.customer_email} (Commande {order.order_id})"))
+            else:
+                failed_count += 1
+                error_msg = f"Échec de l'envoi pour la commande {order.order_id} à {order.customer_email}"
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                if verbosity >= 1:
+                    write(error_style(f"✗ Échec pour {order.customer_email} (Commande {order.order_id})"))
+
+        return sent_ids, failed_count
+
+    def queue_batch(self, order_pks):
+        """Publie les tâches d'envoi d'un lot de commandes en un seul appel au broker (mode --async)"""
+        if order_pks:
+            from celery import group
+            from apps.orders.tasks import send_review_email_task
+
+            group(send_review_email_task.s(pk) for pk in order_pks).apply_async(queue=self.EMAIL_QUEUE)
+
+    def skip_reason(self, pk, order_id, customer_email, from_client_id):
+        """Message expliquant pourquoi une commande en attente n'est pas envoyable"""
+        if not order_id:
+            return f"Commande ID {pk}: order_id est vide"
+        if from_client_id is None:
+            return f"Commande {order_id}: Aucun client associé"
+        if not customer_email:
+            return f"Commande {order_id}: Email client vide"
+        return f"Commande {order_id}: Email invalide '{customer_email}'"
 
     def handle(self, *args, **options): #Gère l'envoi des emails de demande de revue
         dry_run = options['dry_run']
         limit = options['limit']
         verbosity = options['verbosity']
+        # Le dry-run reste synchrone : aucune tâche n'est mise en file
+        use_async = options['use_async'] and not dry_run
         
         logger.info("Démarrage de l'envoi des emails de demande d'avis")
         self.stdout.write(self.style.SUCCESS("Démarrage de l'envoi des emails de demande d'avis..."))
@@ -38,17 +208,38 @@ class Command(BaseCommand):
             logger.warning("Mode Dry-Run activé. Aucun email ne sera envoyé et aucune modification ne sera sauvegardée.")
             self.stdout.write(self.style.WARNING("Mode Dry-Run activé. Aucun email ne sera envoyé. 🛡️"))
         
-        # Récupérer les commandes non traitées
-        orders_queryset = Order.objects.filter(mail_sent=False)
+        # Récupérer les commandes non traitées envoyables (email valide, order_id renseigné,
+        # client associé) ; les conditions sont vérifiées par la base plutôt que commande par
+        # commande, les autres commandes sont seulement comptées
+        # select_related évite tout accès à la base depuis les threads d'envoi ; seules les
+        # colonnes lues par l'email sont chargées (du client, seul shop est utilisé)
+        pending_queryset = Order.objects.filter(mail_sent=False)
+        sendable = Q(order_id__gt='', from_client__isnull=False)
+        # Les rares adresses refusées par EMAIL_PATTERN mais dont le domaine n'a pas de point sont
+        # revérifiées en Python avec la même règle qu'à l'import (is_valid_email, ex: admin@localhost)
+        fallback_pks = [
+            pk for pk, email in pending_queryset.filter(
+                sendable, customer_email__regex=DOTLESS_DOMAIN_EMAIL_PATTERN
+            ).values_list('pk', 'customer_email')
+            if is_valid_email(email)
+        ]
+        sendable &= Q(customer_email__regex=EMAIL_PATTERN) | Q(pk__in=fallback_pks)
+        pending_count = pending_queryset.count()
+        orders_queryset = pending_queryset.filter(sendable).select_related('from_client').only(
+            'id', 'order_id', 'customer_email', 'customer_name', 'product_id',
+            'from_client', 'from_client__shop'
+        )
         total_orders = orders_queryset.count()
+        unsendable_count = pending_count - total_orders
         
-        if total_orders == 0:
+        if pending_count == 0:
             logger.info("Aucune commande en attente d'envoi d'email")
             self.stdout.write(self.style.SUCCESS("Aucune commande en attente d'envoi d'email."))
             return
         
         if limit:
-            orders_queryset = orders_queryset[:limit]
+            # Les commandes les plus récentes d'abord (BaseModel n'a plus d'ordre par défaut)
+            orders_queryset = orders_queryset.order_by('-created_at')[:limit]
             total_orders = min(total_orders, limit)
             logger.info(f"Limite de {limit} commande(s) appliquée")
             self.stdout.write(self.style.WARNING(f"Limite de {limit} commande(s) appliquée"))
@@ -58,121 +249,91 @@ class Command(BaseCommand):
         
         success_count = 0
         failed_count = 0
-        skipped_count = 0
-        errors = []
+        skipped_count = unsendable_count
+        errors = deque(maxlen=self.MAX_REPORTED_ERRORS)
+        # Chaque commande ignorée compte comme une erreur, même si seules les premières sont détaillées
+        errors_total = unsendable_count
+        if unsendable_count:
+            logger.warning(f"{unsendable_count} commande(s) ignorée(s) : email invalide, order_id vide ou aucun client associé")
+            # Seules les premières commandes ignorées sont relues pour le détail du rapport
+            unsendable = pending_queryset.exclude(sendable).values_list(
+                'pk', 'order_id', 'customer_email', 'from_client_id'
+            )[:self.MAX_REPORTED_SKIPS]
+            for row in unsendable:
+                error_msg = self.skip_reason(*row)
+                logger.warning(error_msg)
+                errors.append(error_msg)
+                if verbosity >= 1:
+                    self.stdout.write(self.style.WARNING(error_msg))
+        pending_orders = []
+        sent_ids = []
+        queued_pks = []
+        self.thread_state = threading.local()
+        self.email_connections = []
+        self.output_buffer = []
+        write = self.write_buffered
         
         try:
-            with transaction.atomic():
-                for order in tqdm(orders_queryset, total=total_orders, desc="Envoi des emails"):
-                    # Validation préalable de l'email
-                    if not order.customer_email:
-                        error_msg = f"Commande {order.order_id or order.pk}: Email client vide"
-                        logger.warning(error_msg)
-                        errors.append(error_msg)
-                        skipped_count += 1
-                        if verbosity >= 1:
-                            self.stdout.write(self.style.WARNING(error_msg))
-                        continue
-                    
-                    try:
-                        validate_email(order.customer_email)
-                    except ValidationError:
-                        error_msg = f"Commande {order.order_id or order.pk}: Email invalide '{order.customer_email}'"
-                        logger.warning(error_msg)
-                        errors.append(error_msg)
-                        skipped_count += 1
-                        if verbosity >= 1:
-                            self.stdout.write(self.style.WARNING(error_msg))
-                        continue
-                    
-                    # Validation que la commande a un order_id
-                    if not order.order_id:
-                        error_msg = f"Commande ID {order.pk}: order_id est vide"
-                        logger.warning(error_msg)
-                        errors.append(error_msg)
-                        skipped_count += 1
-                        if verbosity >= 1:
-                            self.stdout.write(self.style.WARNING(error_msg))
-                        continue
-                    
-                    # Validation que la commande a un client associé
-                    if not order.from_client:
-                        error_msg = f"Commande {order.order_id}: Aucun client associé"
-                        logger.warning(error_msg)
-                        errors.append(error_msg)
-                        skipped_count += 1
-                        if verbosity >= 1:
-                            self.stdout.write(self.style.WARNING(error_msg))
-                        continue
-                    
+            # Une seule transaction pour tous les marquages : un seul commit en fin de commande
+            with transaction.atomic(), ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+                self.disable_synchronous_commit()
+                if dry_run or use_async:
+                    # Sans envoi local (simulation ou tâches Celery qui relisent la commande), de
+                    # simples tuples suffisent : pas d'instanciation de modèles
+                    orders_queryset = orders_queryset.values_list('pk', 'order_id', 'customer_email', named=True)
+                orders = orders_queryset.iterator(chunk_size=self.FETCH_CHUNK_SIZE)
+                # La barre tqdm coûte un appel par itération : réservée au mode verbeux
+                show_progress = verbosity == 1
+                if verbosity >= 2:
+                    orders = tqdm(orders, total=total_orders, desc="Envoi des emails")
+                for index, order in enumerate(orders, 1):
+                    if show_progress and index % self.PROGRESS_INTERVAL == 0:
+                        # La progression est écrite immédiatement, après les détails qui la précèdent
+                        self.flush_output()
+                        self.stdout.write(f"{index}/{total_orders} commande(s) traitée(s)")
+
                     # Envoi de l'email (ou simulation en dry-run)
                     if dry_run:
                         logger.debug(f"[DRY-RUN] Email serait envoyé pour la commande {order.order_id} à {order.customer_email}")
                         if verbosity >= 2:
-                            self.stdout.write(f"[DRY-RUN] Email serait envoyé pour la commande {order.order_id} à {order.customer_email}")
+                            write(f"[DRY-RUN] Email serait envoyé pour la commande {order.order_id} à {order.customer_email}")
                         success_count += 1
+                    elif use_async:
+                        # Le worker marque la commande comme envoyée après un envoi réussi
+                        queued_pks.append(order.pk)
+                        success_count += 1
+                        if len(queued_pks) >= self.SEND_BATCH_SIZE:
+                            self.queue_batch(queued_pks)
+                            queued_pks = []
                     else:
-                        if send_review_request_email(order):
-                            try:
-                                order.mail_sent = True
-                                order.mail_sent_at = timezone.now()
-                                order.save()
-                                success_count += 1
-                                logger.info(f"Email envoyé avec succès pour la commande {order.order_id} à {order.customer_email}")
-                                if verbosity >= 2:
-                                    self.stdout.write(self.style.SUCCESS(f"✓ Email envoyé à {order.customer_email} (Commande {order.order_id})"))
-                            except IntegrityError as e:
-                                error_msg = f"Commande {order.order_id}: Erreur lors de la sauvegarde - {str(e)}"
-                                logger.error(error_msg, exc_info=True)
-                                errors.append(error_msg)
-                                failed_count += 1
-                                if verbosity >= 1:
-                                    self.stdout.write(self.style.ERROR(error_msg))
-                            except Exception as e:
-                                error_msg = f"Commande {order.order_id}: Erreur inattendue lors de la sauvegarde - {str(e)}"
-                                logger.error(error_msg, exc_info=True)
-                                errors.append(error_msg)
-                                failed_count += 1
-                                if verbosity >= 1:
-                                    self.stdout.write(self.style.ERROR(error_msg))
-                        else:
-                            failed_count += 1
-                            error_msg = f"Échec de l'envoi pour la commande {order.order_id} à {order.customer_email}"
-                            logger.warning(error_msg)
-                            errors.append(error_msg)
-                            if verbosity >= 1:
-                                self.stdout.write(self.style.ERROR(f"✗ Échec pour {order.customer_email} (Commande {order.order_id})"))
-                
+                        pending_orders.append(order)
+                        if len(pending_orders) >= self.SEND_BATCH_SIZE:
+                            batch_sent_ids, failed = self.send_batch(executor, pending_orders, errors, verbosity)
+                            success_count += len(batch_sent_ids)
+                            failed_count += failed
+                            errors_total += failed
+                            pending_orders = []
+
+                            sent_ids.extend(batch_sent_ids)
+                            if len(sent_ids) >= self.UPDATE_BATCH_SIZE:
+                                self.mark_sent(sent_ids)
+                                sent_ids = []
+
+                self.queue_batch(queued_pks)
+                if pending_orders:
+                    batch_sent_ids, failed = self.send_batch(executor, pending_orders, errors, verbosity)
+                    success_count += len(batch_sent_ids)
+                    failed_count += failed
+                    errors_total += failed
+                    sent_ids.extend(batch_sent_ids)
+                self.mark_sent(sent_ids)
+                self.flush_output()
+
                 if dry_run:
-                    raise Exception("DryRunRollback")
-                else:
-                    # Afficher le résumé
-                    logger.info(f"Envoi terminé - Succès: {success_count}, Échecs: {failed_count}, Ignorées: {skipped_count}")
-                    self.stdout.write(self.style.SUCCESS("\n" + "="*60))
-                    self.stdout.write(self.style.SUCCESS("Résumé de l'envoi :"))
-                    self.stdout.write(self.style.SUCCESS(f"  ✓ Emails envoyés avec succès : {success_count}"))
-                    if failed_count > 0:
-                        self.stdout.write(self.style.ERROR(f"  ✗ Échecs d'envoi : {failed_count}"))
-                    if skipped_count > 0:
-                        self.stdout.write(self.style.WARNING(f"  ⚠ Commandes ignorées : {skipped_count}"))
-                    self.stdout.write(self.style.SUCCESS("="*60))
-                    
-                    if errors and verbosity >= 1:
-                        self.stdout.write(self.style.ERROR("\nDétails des erreurs :"))
-                        for error in errors[:20]:  # Limiter à 20 erreurs pour la lisibilité
-                            self.stdout.write(self.style.ERROR(f"  - {error}"))
-                        if len(errors) > 20:
-                            self.stdout.write(self.style.ERROR(f"  ... et {len(errors) - 20} erreur(s) supplémentaire(s)"))
-                    
-                    if success_count > 0:
-                        logger.info("Envoi des emails terminé avec succès")
-                        self.stdout.write(self.style.SUCCESS("\nEnvoi des emails terminé ! 📧"))
-                    elif failed_count > 0 or skipped_count > 0:
-                        logger.warning("Aucun email n'a pu être envoyé. Vérifiez les erreurs ci-dessus.")
-                        self.stdout.write(self.style.WARNING("\nAucun email n'a pu être envoyé. Vérifiez les erreurs ci-dessus."))
-        
-        except Exception as e:
-            if str(e) == "DryRunRollback":
+                    # Annule toute écriture éventuelle à la sortie du bloc atomic
+                    transaction.set_rollback(True)
+
+            if dry_run:
                 # Afficher le résumé même en dry-run
                 logger.info(f"Simulation terminée - Succès: {success_count}, Échecs: {failed_count}, Ignorées: {skipped_count}")
                 self.stdout.write(self.style.SUCCESS("\n" + "="*60))
@@ -185,10 +346,44 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS("="*60))
                 self.stdout.write(self.style.SUCCESS("\nSimulation terminée. Aucun email n'a été envoyé. 🧹"))
             else:
-                error_msg = f"Une erreur inattendue est survenue : {e}"
-                logger.exception(error_msg)
-                self.stdout.write(self.style.ERROR(error_msg))
-                if verbosity >= 2:
-                    import traceback
-                    self.stdout.write(self.style.ERROR(traceback.format_exc()))
-                raise e
\ No newline at end of file
+                # Afficher le résumé
+                logger.info(f"Envoi terminé - Succès: {success_count}, Échecs: {failed_count}, Ignorées: {skipped_count}")
+                self.stdout.write(self.style.SUCCESS("\n" + "="*60))
+                self.stdout.write(self.style.SUCCESS("Résumé de l'envoi :"))
+                if use_async:
+                    self.stdout.write(self.style.SUCCESS(f"  ✓ Emails mis en file d'attente : {success_count}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"  ✓ Emails envoyés avec succès : {success_count}"))
+                if failed_count > 0:
+                    self.stdout.write(self.style.ERROR(f"  ✗ Échecs d'envoi : {failed_count}"))
+                if skipped_count > 0:
+                    self.stdout.write(self.style.WARNING(f"  ⚠ Commandes ignorées : {skipped_count}"))
+                self.stdout.write(self.style.SUCCESS("="*60))
+                
+                if errors and verbosity >= 1:
+                    self.stdout.write(self.style.ERROR("\nDétails des erreurs :"))
+                    for error in errors:  # Limité à MAX_REPORTED_ERRORS erreurs pour la lisibilité
+                        self.stdout.write(self.style.ERROR(f"  - {error}"))
+                    if errors_total > len(errors):
+                        self.stdout.write(self.style.ERROR(f"  ... et {errors_total - len(errors)} erreur(s) supplémentaire(s)"))
+                
+                if success_count > 0:
+                    logger.info("Envoi des emails terminé avec succès")
+                    self.stdout.write(self.style.SUCCESS("\nEnvoi des emails terminé ! 📧"))
+                elif failed_count > 0 or skipped_count > 0:
+                    logger.warning("Aucun email n'a pu être envoyé. Vérifiez les erreurs ci-dessus.")
+                    self.stdout.write(self.style.WARNING("\nAucun email n'a pu être envoyé. Vérifiez les erreurs ci-dessus."))
+
+        except Exception as e:
+            self.flush_output()
+            error_msg = f"Une erreur inattendue est survenue : {e}"
+            logger.exception(error_msg)
+            self.stdout.write(self.style.ERROR(error_msg))
+            if verbosity >= 2:
+                import traceback
+                self.stdout.write(self.style.ERROR(traceback.format_exc()))
+            raise e
+        finally:
+            # Les détails en attente ne sont pas perdus en cas d'interruption (Ctrl+C)
+            self.flush_output()
+            self.close_email_connections()
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-15 21:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_userclient_userclient_email_client_idx'),
+        ('orders', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_id', 'from_client'], name='order_orderid_client_idx'),
+        ),
+    ]
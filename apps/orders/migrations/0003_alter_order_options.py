@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-15 21:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_order_orderid_client_idx'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='order',
+            options={},
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-15 21:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_alter_order_options'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='uuid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-15 22:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0004_alter_client_uuid_alter_userclient_uuid'),
+        ('orders', '0004_alter_order_uuid'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('mail_sent', False)), fields=['mail_sent'], name='orders_unsent_idx'),
+        ),
+    ]
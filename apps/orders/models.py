@@ -15,4 +15,11 @@ class Order(BaseModel):
         related_name = "orders"
     )
     mail_sent = models.BooleanField(default=False)
-    mail_sent_at = models.DateTimeField(null = True, blank = True)
\ No newline at end of file
+    mail_sent_at = models.DateTimeField(null = True, blank = True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(fields=['order_id', 'from_client'], name='order_orderid_client_idx'),
+            # Index partiel : ne couvre que les commandes en attente d'email, pas tout l'historique
+            models.Index(fields=['mail_sent'], name='orders_unsent_idx', condition=models.Q(mail_sent=False)),
+        ]
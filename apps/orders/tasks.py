@@ -0,0 +1,56 @@
+from celery import shared_task
+from django.db import transaction
+from django.utils import timezone
+from apps.common.validators import is_valid_email
+from apps.orders.models import Order
+from apps.orders.utils import send_review_request_email
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=3, acks_late=True)
+def send_review_email_task(self, order_pk):
+    """
+    Envoie l'email de demande d'avis d'une commande depuis un worker Celery.
+
+    La commande n'est marquée comme envoyée qu'après un envoi réussi ; en cas d'échec
+    de l'envoi la tâche est relancée avec un délai croissant (1, 2 puis 4 minutes). Une
+    commande qui ne peut pas être envoyée (email invalide, order_id vide, aucun client)
+    n'est pas relancée. La ligne de la commande reste verrouillée (select_for_update) pendant
+    l'envoi : deux tâches pour la même commande (commande relancée avant que la file soit
+    vidée, acks_late) ne l'envoient qu'une fois.
+
+    Args:
+        order_pk: Clé primaire de la commande
+
+    Returns:
+        bool: True si l'email a été envoyé, False sinon
+    """
+    with transaction.atomic():
+        order = Order.objects.select_for_update(of=('self',)).select_related('from_client').only(
+            'id', 'order_id', 'customer_email', 'customer_name', 'product_id',
+            'from_client', 'from_client__shop', 'mail_sent'
+        ).filter(pk=order_pk).first()
+
+        if order is None:
+            logger.warning("Commande %s introuvable, email non envoyé", order_pk)
+            return False
+
+        # Une autre tâche a déjà envoyé l'email (le verrou a attendu sa fin)
+        if order.mail_sent:
+            return True
+
+        # Échecs définitifs : une nouvelle tentative échouerait de la même façon
+        if not order.order_id or order.from_client_id is None or not is_valid_email(order.customer_email):
+            logger.warning("Commande %s non envoyable (order_id, client ou email invalide), pas de nouvelle tentative", order_pk)
+            return False
+
+        sent = send_review_request_email(order)
+        if sent:
+            now = timezone.now()
+            Order.objects.filter(pk=order_pk).update(mail_sent=True, mail_sent_at=now, updated_at=now)
+
+    if not sent:
+        raise self.retry(countdown=60 * 2 ** self.request.retries)
+    return True
@@ -1,6 +1,18 @@
+from django.core import mail
+from django.core.mail import get_connection
+from django.core.management import call_command
 from django.test import TestCase
 from apps.orders.models import Order
 from apps.clients.models import Client
+from apps.orders.management.commands.send_review_emails import Command as SendReviewEmailsCommand
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+import importlib.util
+import socket
+
+# Celery est optionnel : les tests du mode --async ne tournent que s'il est installé
+HAS_CELERY = importlib.util.find_spec('celery') is not None
 
 class OrderTest(TestCase):
     def test_order_creation(self):
@@ -14,3 +26,296 @@ class OrderTest(TestCase):
             )
         )
         self.assertEqual(order.order_id, "1234567890")
+
+
+class SendReviewEmailsCommandTest(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            email="shop@example.com",
+            shop="my-store",
+            first_name="John",
+            last_name="Doe"
+        )
+
+    def create_order(self, order_id, customer_email):
+        return Order.objects.create(
+            order_id=order_id,
+            customer_email=customer_email,
+            customer_name="Alice",
+            product_id=[123, 456],
+            from_client=self.client_obj
+        )
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command('send_review_emails', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_sends_emails_and_marks_orders(self):
+        order = self.create_order("ORD-001", "customer1@example.com")
+        created_updated_at = order.updated_at
+        self.run_command()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["customer1@example.com"])
+        self.assertIn("ORD-001", mail.outbox[0].subject)
+        order.refresh_from_db()
+        self.assertTrue(order.mail_sent)
+        self.assertIsNotNone(order.mail_sent_at)
+        self.assertGreater(order.updated_at, created_updated_at)
+
+    def test_email_has_plain_text_and_html_bodies(self):
+        order = self.create_order("ORD-001", "customer1@example.com")
+        order.customer_name = ""
+        order.save()
+        self.run_command()
+        message = mail.outbox[0]
+        self.assertIn("Bonjour Client,", message.body)
+        self.assertIn("commande ORD-001 chez my-store", message.body)
+        self.assertIn("- Produit référence : 123\n- Produit référence : 456\n", message.body)
+        self.assertEqual(message.alternatives[0][1], "text/html")
+
+    def test_emails_for_the_same_products_keep_their_own_values(self):
+        self.create_order("ORD-001", "customer1@example.com")
+        order = self.create_order("ORD-002", "customer2@example.com")
+        order.customer_name = "<b>Bob</b>"
+        order.save()
+        self.run_command()
+        messages = {message.to[0]: message for message in mail.outbox}
+        first, second = messages["customer1@example.com"], messages["customer2@example.com"]
+        self.assertIn("Bonjour Alice,", first.body)
+        self.assertIn("commande ORD-001 chez my-store", first.body)
+        self.assertIn("Bonjour <b>Bob</b>,", second.body)
+        self.assertIn("commande ORD-002 chez my-store", second.body)
+        self.assertIn("&lt;b&gt;Bob&lt;/b&gt;", second.alternatives[0][0])
+        self.assertIn("<strong>ORD-002</strong>", second.alternatives[0][0])
+
+    def test_equal_products_of_different_types_are_rendered_separately(self):
+        first = self.create_order("ORD-001", "customer1@example.com")
+        second = self.create_order("ORD-002", "customer2@example.com")
+        third = self.create_order("ORD-003", "customer3@example.com")
+        Order.objects.filter(pk=first.pk).update(product_id=[1])
+        Order.objects.filter(pk=second.pk).update(product_id=[True])
+        Order.objects.filter(pk=third.pk).update(product_id=[1.5])
+        # Un seul thread : les commandes sont rendues dans l'ordre, le cache est rempli par la première
+        with mock.patch.object(SendReviewEmailsCommand, 'MAX_WORKERS', 1):
+            self.run_command()
+        bodies = {message.to[0]: message.body for message in mail.outbox}
+        self.assertIn("- Produit référence : 1\n", bodies["customer1@example.com"])
+        self.assertIn("- Produit référence : True\n", bodies["customer2@example.com"])
+        self.assertIn("- Produit référence : 1.5\n", bodies["customer3@example.com"])
+
+    def test_sends_every_pending_order(self):
+        for i in range(5):
+            self.create_order(f"ORD-00{i}", f"customer{i}@example.com")
+        self.run_command()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(Order.objects.filter(mail_sent=False).exists())
+
+    def test_orders_marked_together_share_one_timestamp(self):
+        for i in range(3):
+            self.create_order(f"ORD-00{i}", f"customer{i}@example.com")
+        self.run_command()
+        timestamps = set(Order.objects.values_list('mail_sent_at', flat=True))
+        self.assertEqual(len(timestamps), 1)
+        self.assertEqual(set(Order.objects.values_list('updated_at', flat=True)), timestamps)
+
+    def test_invalid_email_is_skipped(self):
+        order = self.create_order("ORD-001", "not-an-email")
+        output = self.run_command()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertIn("Commandes ignorées : 1", output)
+        order.refresh_from_db()
+        self.assertFalse(order.mail_sent)
+
+    def test_empty_and_missing_emails_are_skipped(self):
+        self.create_order("ORD-001", "customer1@example.com")
+        self.create_order("ORD-002", "")
+        self.create_order("ORD-003", None)
+        self.create_order("ORD-004", "john doe@example.com")
+        output = self.run_command()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Commandes ignorées : 3", output)
+        self.assertEqual(Order.objects.filter(mail_sent=False).count(), 3)
+
+    def test_email_with_trailing_newline_is_skipped(self):
+        self.create_order("ORD-001", "customer1@example.com")
+        self.create_order("ORD-002", "customer2@example.com\n")
+        output = self.run_command()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Commandes ignorées : 1", output)
+        self.assertNotIn("Échecs d'envoi", output)
+
+    def test_emails_accepted_by_the_import_are_sent(self):
+        # Refusée par EMAIL_PATTERN mais acceptée par is_valid_email, comme à l'import
+        order = self.create_order("ORD-001", "admin@localhost")
+        self.create_order("ORD-002", "not-an-email")
+        output = self.run_command()
+        self.assertEqual([message.to for message in mail.outbox], [["admin@localhost"]])
+        self.assertIn("Commandes ignorées : 1", output)
+        order.refresh_from_db()
+        self.assertTrue(order.mail_sent)
+
+    def test_orders_without_order_id_or_client_are_skipped(self):
+        self.create_order("ORD-001", "customer1@example.com")
+        no_order_id = self.create_order("", "customer2@example.com")
+        Order.objects.create(order_id="ORD-003", customer_email="customer3@example.com")
+        output = self.run_command()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn("Commandes ignorées : 2", output)
+        self.assertIn(f"Commande ID {no_order_id.pk}: order_id est vide", output)
+        self.assertIn("Commande ORD-003: Aucun client associé", output)
+
+    def test_error_report_is_limited_to_the_last_errors(self):
+        for i in range(25):
+            self.create_order(f"ORD-{i:03}", f"customer{i}@example.com")
+        with mock.patch(
+            'apps.orders.management.commands.send_review_emails.send_review_request_email', return_value=False
+        ):
+            output = self.run_command()
+        self.assertIn("Échecs d'envoi : 25", output)
+        self.assertEqual(output.count("  - Échec de l'envoi"), 20)
+        self.assertIn("... et 5 erreur(s) supplémentaire(s)", output)
+
+    def test_limit_sends_the_most_recent_orders(self):
+        older = self.create_order("ORD-001", "customer1@example.com")
+        newer = self.create_order("ORD-002", "customer2@example.com")
+        Order.objects.filter(pk=older.pk).update(created_at=newer.created_at - timedelta(days=1))
+        self.run_command('--limit', '1')
+        self.assertEqual([message.to for message in mail.outbox], [["customer2@example.com"]])
+
+    def test_every_skipped_order_counts_in_the_error_report(self):
+        for i in range(26):
+            self.create_order(f"ORD-{i:03}", f"invalid-{i}")
+        output = self.run_command()
+        self.assertIn("Commandes ignorées : 26", output)
+        self.assertEqual(output.count("  - Commande ORD-"), 20)
+        self.assertIn("... et 6 erreur(s) supplémentaire(s)", output)
+
+    def test_dry_run_sends_nothing(self):
+        order = self.create_order("ORD-001", "customer1@example.com")
+        output = self.run_command('--dry-run')
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertIn("Emails qui auraient été envoyés : 1", output)
+        order.refresh_from_db()
+        self.assertFalse(order.mail_sent)
+
+    def test_progress_is_written_as_orders_are_processed(self):
+        for i in range(4):
+            self.create_order(f"ORD-00{i}", f"customer{i}@example.com")
+        out = StringIO()
+        writes = []
+        out.write = lambda text: writes.append(text) or len(text)
+        with mock.patch.object(SendReviewEmailsCommand, 'PROGRESS_INTERVAL', 2), \
+                mock.patch.object(SendReviewEmailsCommand, 'OUTPUT_BUFFER_SIZE', 1000):
+            call_command('send_review_emails', stdout=out, stderr=StringIO())
+        # Chaque ligne de progression est écrite seule, sans attendre le remplissage du tampon
+        self.assertIn("2/4 commande(s) traitée(s)\n", writes)
+        self.assertIn("4/4 commande(s) traitée(s)\n", writes)
+
+    def test_reuses_one_email_connection_per_thread(self):
+        for i in range(5):
+            self.create_order(f"ORD-00{i}", f"customer{i}@example.com")
+        with mock.patch.object(SendReviewEmailsCommand, 'MAX_WORKERS', 1), mock.patch(
+            'apps.orders.management.commands.send_review_emails.get_connection', wraps=get_connection
+        ) as mocked_get_connection:
+            self.run_command()
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mocked_get_connection.call_count, 1)
+
+    def test_unreachable_smtp_server_counts_failures(self):
+        for i in range(3):
+            self.create_order(f"ORD-00{i}", f"customer{i}@example.com")
+        # Port libre : aucune connexion possible
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with self.settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=port, EMAIL_TIMEOUT=1,
+        ):
+            output = self.run_command()
+        self.assertIn("Échecs d'envoi : 3", output)
+        self.assertEqual(Order.objects.filter(mail_sent=False).count(), 3)
+
+
+@skipUnless(HAS_CELERY, "Celery n'est pas installé")
+class SendReviewEmailsAsyncTest(TestCase):
+    def setUp(self):
+        self.client_obj = Client.objects.create(email="shop@example.com", shop="my-store")
+
+    def create_order(self, order_id, customer_email, **kwargs):
+        return Order.objects.create(
+            order_id=order_id,
+            customer_email=customer_email,
+            customer_name="Alice",
+            product_id=[123],
+            from_client=self.client_obj,
+            **kwargs
+        )
+
+    def test_async_queues_tasks_in_groups(self):
+        orders = [self.create_order(f"ORD-00{i}", f"customer{i}@example.com") for i in range(5)]
+        groups = []
+
+        def fake_group(signatures):
+            groups.append(mock.Mock(signatures=list(signatures)))
+            return groups[-1]
+
+        out = StringIO()
+        with mock.patch.object(SendReviewEmailsCommand, 'SEND_BATCH_SIZE', 2), \
+                mock.patch('celery.group', side_effect=fake_group), \
+                mock.patch('apps.orders.tasks.send_review_email_task') as mocked_task:
+            mocked_task.s.side_effect = lambda pk: pk
+            call_command('send_review_emails', '--async', stdout=out, stderr=StringIO())
+
+        self.assertEqual([len(group.signatures) for group in groups], [2, 2, 1])
+        self.assertEqual(
+            sorted(pk for group in groups for pk in group.signatures),
+            sorted(order.pk for order in orders),
+        )
+        for group in groups:
+            group.apply_async.assert_called_once_with(queue='email_queue')
+        self.assertIn("Emails mis en file d'attente : 5", out.getvalue())
+        self.assertEqual(len(mail.outbox), 0)
+        # Les commandes ne sont marquées envoyées que par les workers
+        self.assertEqual(Order.objects.filter(mail_sent=False).count(), 5)
+
+    def test_task_sends_email_and_marks_order(self):
+        from apps.orders.tasks import send_review_email_task
+
+        order = self.create_order("ORD-001", "customer1@example.com")
+        self.assertTrue(send_review_email_task(order.pk))
+        self.assertEqual(len(mail.outbox), 1)
+        order.refresh_from_db()
+        self.assertTrue(order.mail_sent)
+        self.assertIsNotNone(order.mail_sent_at)
+
+    def test_task_does_not_resend_an_order_already_sent(self):
+        from apps.orders.tasks import send_review_email_task
+
+        order = self.create_order("ORD-001", "customer1@example.com", mail_sent=True)
+        self.assertTrue(send_review_email_task(order.pk))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_task_does_not_retry_an_order_that_cannot_be_sent(self):
+        from apps.orders.tasks import send_review_email_task
+
+        invalid_email = self.create_order("ORD-001", "not-an-email")
+        no_order_id = self.create_order("", "customer2@example.com")
+        no_client = Order.objects.create(order_id="ORD-003", customer_email="customer3@example.com")
+        with mock.patch('apps.orders.tasks.send_review_request_email') as mocked_send:
+            for order in (invalid_email, no_order_id, no_client):
+                self.assertFalse(send_review_email_task(order.pk))
+        mocked_send.assert_not_called()
+        self.assertEqual(Order.objects.filter(mail_sent=False).count(), 3)
+
+    def test_task_failure_leaves_order_unsent_and_retries(self):
+        from celery.exceptions import Retry
+        from apps.orders.tasks import send_review_email_task
+
+        order = self.create_order("ORD-001", "customer1@example.com")
+        with mock.patch('apps.orders.tasks.send_review_request_email', return_value=False):
+            with self.assertRaises(Retry):
+                send_review_email_task(order.pk)
+        order.refresh_from_db()
+        self.assertFalse(order.mail_sent)
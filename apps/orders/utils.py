@@ -1,19 +1,97 @@
-from django.core.mail import send_mail
-from django.core.validators import validate_email
-from django.core.exceptions import ValidationError
-from django.template.loader import render_to_string
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import get_template
 from django.template.exceptions import TemplateDoesNotExist, TemplateSyntaxError
+from django.utils.html import escape
+from apps.common.validators import is_valid_email
 from apps.orders.models import Order
+from functools import lru_cache
+from types import SimpleNamespace
 import logging
+import orjson
+import re
 
 logger = logging.getLogger(__name__)
 
-def send_review_request_email(order: Order):
+REVIEW_HTML_TEMPLATE_NAME = 'orders/review_request.html'
+REVIEW_TEXT_TEMPLATE_NAME = 'orders/review_request.txt'
+
+
+@lru_cache(maxsize=None)
+def get_review_template(template_name):
+    """Charge et compile une seule fois un template de la demande d'avis"""
+    return get_template(template_name)
+
+
+# Rendus des templates par boutique et liste de produits, avec des marqueurs à la place
+# du nom du client et du numéro de commande
+_rendered_reviews = {}
+_RENDERED_REVIEWS_MAX_SIZE = 10000
+_CUSTOMER_NAME_TOKEN = '\x00customer_name\x00'
+_ORDER_ID_TOKEN = '\x00order_id\x00'
+_TOKEN_RE = re.compile('\x00(customer_name|order_id)\x00')
+
+
+def _render_review_templates(order):
+    """Rend les templates HTML et texte pour une commande (ou un objet qui en a les attributs)"""
+    context = {'order': order}
+    return (
+        get_review_template(REVIEW_HTML_TEMPLATE_NAME).render(context),
+        get_review_template(REVIEW_TEXT_TEMPLATE_NAME).render(context),
+    )
+
+
+def render_review_messages(order: Order):
+    """
+    Rend les versions HTML et texte de l'email de demande d'avis d'une commande.
+
+    Les templates ne sont rendus qu'une fois par boutique et liste de produits, avec des
+    marqueurs à la place du nom du client et du numéro de commande, remplacés ensuite en une
+    seule passe (échappés pour la version HTML). Les commandes sans nom de client ou dont les
+    produits ne sont pas une liste sérialisable en JSON sont rendues normalement.
+
+    Returns:
+        tuple: (message HTML, message texte)
+    """
+    products = order.product_id
+    if not order.customer_name or not order.order_id or not (products is None or isinstance(products, list)):
+        return _render_review_templates(order)
+
+    shop = order.from_client.shop
+    try:
+        # Clé sérialisée : 1, True et 1.0 sont égaux (et de même hash) mais ne s'affichent pas pareil
+        key = (shop, orjson.dumps(products))
+    except orjson.JSONEncodeError:
+        return _render_review_templates(order)
+    rendered = _rendered_reviews.get(key)
+
+    if rendered is None:
+        placeholder = SimpleNamespace(
+            customer_name=_CUSTOMER_NAME_TOKEN,
+            order_id=_ORDER_ID_TOKEN,
+            product_id=products,
+            from_client=SimpleNamespace(shop=shop),
+        )
+        if len(_rendered_reviews) >= _RENDERED_REVIEWS_MAX_SIZE:
+            _rendered_reviews.clear()
+        rendered = _rendered_reviews[key] = _render_review_templates(placeholder)
+
+    html_template, text_template = rendered
+    text_values = {'customer_name': str(order.customer_name), 'order_id': str(order.order_id)}
+    html_values = {name: escape(value) for name, value in text_values.items()}
+    return (
+        _TOKEN_RE.sub(lambda match: html_values[match.group(1)], html_template),
+        _TOKEN_RE.sub(lambda match: text_values[match.group(1)], text_template),
+    )
+
+
+def send_review_request_email(order: Order, connection=None):
     """
     Envoie un email de demande d'avis pour une commande.
     
     Args:
         order: Instance de Order pour laquelle envoyer l'email
+        connection: Connexion d'envoi déjà ouverte (get_connection()) à réutiliser ;
+            par défaut une connexion est ouverte puis fermée pour ce seul email
         
     Returns:
         bool: True si l'email a été envoyé avec succès, False sinon
@@ -23,10 +101,8 @@ def send_review_request_email(order: Order):
         logger.error(f"Order {order.order_id}: customer_email est vide")
         return False
     
-    try:
-        validate_email(order.customer_email)
-    except ValidationError as e:
-        logger.error(f"Order {order.order_id}: Email invalide '{order.customer_email}': {e}")
+    if not is_valid_email(order.customer_email):
+        logger.error(f"Order {order.order_id}: Email invalide '{order.customer_email}'")
         return False
     
     # Validation que la commande a un order_id
@@ -40,42 +116,26 @@ def send_review_request_email(order: Order):
         return False
     
     try:
-        # Rendu du template HTML
+        # Rendu des templates HTML et texte simple (fallback)
         try:
-            html_message = render_to_string('orders/review_request.html', {'order': order})
-        except TemplateDoesNotExist:
-            logger.error(f"Order {order.order_id}: Template 'orders/review_request.html' introuvable")
+            html_message, plain_message = render_review_messages(order)
+        except TemplateDoesNotExist as e:
+            logger.error(f"Order {order.order_id}: Template '{e}' introuvable")
             return False
         except TemplateSyntaxError as e:
             logger.error(f"Order {order.order_id}: Erreur de syntaxe dans le template: {e}")
             return False
         
-        # Création du message texte simple (fallback)
-        customer_name = order.customer_name or "Client"
-        shop_name = order.from_client.shop if order.from_client else "notre boutique"
-        products_list = ""
-        if order.product_id and isinstance(order.product_id, list):
-            products_list = "\n".join([f"- Produit référence : {product}" for product in order.product_id])
-        
-        plain_message = f"""Bonjour {customer_name},
-
-Merci pour votre commande {order.order_id} chez {shop_name}.
-
-Nous espérons que vous avez apprécié vos produits :
-{products_list}
-
-Pourriez-vous prendre un instant pour partager votre expérience ?
-"""
-        
         # Envoi de l'email
-        send_mail(
+        message = EmailMultiAlternatives(
             subject=f"Partagez votre avis sur votre commande {order.order_id}",
-            message=plain_message,
+            body=plain_message,
             from_email="noreply@inflate.review",
-            recipient_list=[order.customer_email],
-            html_message=html_message,
-            fail_silently=False,
+            to=[order.customer_email],
+            connection=connection,
         )
+        message.attach_alternative(html_message, "text/html")
+        message.send(fail_silently=False)
         
         logger.info(f"Email de demande d'avis envoyé avec succès pour la commande {order.order_id} à {order.customer_email}")
         return True
@@ -0,0 +1,7 @@
+# Celery est optionnel : il n'est requis que pour l'envoi asynchrone des emails (send_review_emails --async)
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ('celery_app',)
@@ -0,0 +1,11 @@
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inflate_back.settings')
+
+app = Celery('inflate_back')
+
+# Configuration lue depuis les settings Django (variables préfixées par CELERY_)
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()